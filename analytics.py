@@ -0,0 +1,33 @@
+"""
+Numeric helpers for lifestyle log analytics.
+These operate on numeric sequences such as the array columns of a LifestyleLogWindow.
+"""
+
+from typing import List, Sequence
+
+def rolling_mean(values: Sequence[float], window: int) -> List[float]:
+    """Trailing mean over the last `window` values at each position.
+
+    The first few positions average over however many values are available,
+    so the result always has the same length as the input.
+    """
+    if window < 1:
+        raise ValueError("window must be at least 1")
+
+    means = []
+    total = 0.0
+    for i, value in enumerate(values):
+        total += value
+        if i >= window:
+            total -= values[i - window]
+        means.append(total / min(i + 1, window))
+    return means
+
+def streak_above(values: Sequence[float], threshold: float) -> int:
+    """Number of consecutive most recent values at or above the threshold."""
+    streak = 0
+    for value in reversed(values):
+        if value < threshold:
+            break
+        streak += 1
+    return streak
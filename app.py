@@ -1,10 +1,17 @@
 import os
+import itertools
 import logging
+import threading
 from datetime import datetime, timedelta
+from functools import wraps
 from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
+from werkzeug.middleware.proxy_fix import ProxyFix
 from werkzeug.security import generate_password_hash, check_password_hash
 from health_ai import HealthAI
 from weather_service import WeatherService
+from models import User, UserProfile, LifestyleLogSeries
+from cache import TTLCache
+from analytics import rolling_mean
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -12,15 +19,76 @@ logging.basicConfig(level=logging.DEBUG)
 app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET", "healthcare_secret_key_2025")
 
+# Deployments sit behind one reverse proxy; trust its X-Forwarded-For so
+# request.remote_addr is the client address rather than the proxy's
+app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1)
+
+# API payloads are small and consumed by our own JS, so skip key sorting and
+# pretty-printing when encoding JSON responses
+app.json.sort_keys = False
+app.json.compact = True
+
 # Initialize services
 health_ai = HealthAI()
 weather_service = WeatherService()
 
+# scrypt via OpenSSL (werkzeug's default); cost can be tuned per deployment.
+# Existing hashes keep verifying because the method is stored in each hash.
+PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+
+# Failed login counts per client IP and per email. Once a key reaches the limit,
+# further attempts are refused without hashing. Refused attempts are not counted,
+# so the lockout ends one TTL after the failure that reached the limit.
+MAX_FAILED_LOGINS = 5
+failed_logins = TTLCache(maxsize=4096, ttl=300)
+_failed_logins_lock = threading.Lock()
+
 # In-memory storage for MVP
 users = {}
+users_by_id = {}
 lifestyle_logs = {}
 user_profiles = {}
 
+# User ids are allocated from a counter so concurrent registrations never collide
+_next_user_id = itertools.count(1)
+_registration_lock = threading.Lock()
+
+def login_required(view):
+    """Redirect anonymous users to login; pass the session's user_id to the view."""
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        user_id = session.get('user_id')
+        if user_id not in users_by_id:
+            # Anonymous, or a session from before the in-memory store was reset
+            session.clear()
+            return redirect(url_for('login'))
+        return view(user_id, *args, **kwargs)
+    return wrapped
+
+def api_login_required(view):
+    """Like login_required, but answer anonymous API calls with a JSON 401."""
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        user_id = session.get('user_id')
+        if user_id not in users_by_id:
+            return jsonify({'error': 'Unauthorized'}), 401
+        return view(user_id, *args, **kwargs)
+    return wrapped
+
+def login_throttled(keys):
+    """Return True if any of the keys has too many recent failed logins."""
+    return any(failed_logins.get(key, 0) >= MAX_FAILED_LOGINS for key in keys)
+
+def record_failed_login(keys):
+    with _failed_logins_lock:
+        for key in keys:
+            failed_logins.set(key, failed_logins.get(key, 0) + 1)
+
+def get_log_series(user_id):
+    """Return the user's lifestyle log series, or an empty one if none exists."""
+    series = lifestyle_logs.get(user_id)
+    return series if series is not None else LifestyleLogSeries(user_id)
+
 @app.route('/')
 def index():
     if 'user_id' in session:
@@ -45,28 +113,34 @@ def register():
             flash('Email already registered. Please login instead.', 'error')
             return redirect(url_for('login'))
         
-        # Create user
-        user_id = len(users) + 1
-        users[email] = {
-            'id': user_id,
-            'name': name,
-            'email': email,
-            'password_hash': generate_password_hash(password),
-            'created_at': datetime.now()
-        }
+        password_hash = generate_password_hash(password, method=PASSWORD_HASH_METHOD)
         
-        # Create user profile
-        user_profiles[user_id] = {
-            'age': age,
-            'gender': gender,
-            'location': location,
-            'exercise_frequency': exercise_frequency,
-            'sleep_hours': sleep_hours,
-            'diet_type': diet_type
-        }
-        
-        # Initialize lifestyle logs
-        lifestyle_logs[user_id] = []
+        # Create user, re-checking the email in case it was taken while hashing
+        with _registration_lock:
+            if email in users:
+                flash('Email already registered. Please login instead.', 'error')
+                return redirect(url_for('login'))
+            
+            user_id = next(_next_user_id)
+            
+            # Create user profile
+            user_profiles[user_id] = UserProfile(
+                user_id=user_id,
+                age=age,
+                gender=gender,
+                location=location,
+                exercise_frequency=exercise_frequency,
+                sleep_hours=sleep_hours,
+                diet_type=diet_type
+            )
+            
+            # Initialize lifestyle logs
+            lifestyle_logs[user_id] = LifestyleLogSeries(user_id)
+            
+            # Publish the user last, so anyone who can log in already has a profile
+            user = User(id=user_id, name=name, email=email, password_hash=password_hash)
+            users_by_id[user_id] = user
+            users[email] = user
         
         flash('Registration successful! Please login.', 'success')
         return redirect(url_for('login'))
@@ -79,14 +153,22 @@ def login():
         email = request.form['email']
         password = request.form['password']
         
+        throttle_keys = (('ip', request.remote_addr), ('email', email.strip().lower()))
+        if login_throttled(throttle_keys):
+            flash('Too many failed login attempts. Please try again in a few minutes.', 'error')
+            return render_template('login.html')
+        
         user = users.get(email)
-        if user and check_password_hash(user['password_hash'], password):
-            session['user_id'] = user['id']
-            session['user_name'] = user['name']
-            session['user_email'] = user['email']
-            flash(f'Welcome back, {user["name"]}!', 'success')
+        if user and check_password_hash(user.password_hash, password):
+            for key in throttle_keys:
+                failed_logins.pop(key)
+            session['user_id'] = user.id
+            session['user_name'] = user.name
+            session['user_email'] = user.email
+            flash(f'Welcome back, {user.name}!', 'success')
             return redirect(url_for('dashboard'))
         else:
+            record_failed_login(throttle_keys)
             flash('Invalid email or password.', 'error')
     
     return render_template('login.html')
@@ -98,27 +180,23 @@ def logout():
     return redirect(url_for('index'))
 
 @app.route('/dashboard')
-def dashboard():
-    if 'user_id' not in session:
-        return redirect(url_for('login'))
-    
-    user_id = session['user_id']
-    profile = user_profiles.get(user_id, {})
-    recent_logs = lifestyle_logs.get(user_id, [])[-7:]  # Last 7 days
+@login_required
+def dashboard(user_id):
+    profile = user_profiles[user_id]
+    recent_logs = get_log_series(user_id).rows(7)  # Last 7 days
     
-    # Get personalized health tips
-    health_tips = health_ai.get_personalized_tips(profile, recent_logs)
-    
-    # Get location-based alerts with better error handling
-    location_alerts = []
-    if profile.get('location'):
+    # Weather comes from a short-lived cache, so fetch it first and let a
+    # single AI request produce both the tips and the location alerts
+    weather_data = None
+    if profile.location:
         try:
-            weather_data = weather_service.get_weather_alerts(profile['location'])
-            if weather_data:
-                location_alerts = health_ai.get_location_based_alerts(weather_data, profile)
+            weather_data = weather_service.get_weather_alerts(profile.location)
         except Exception as e:
             logging.error(f"Error getting weather alerts: {e}")
-            location_alerts = []
+    
+    bundle = health_ai.get_dashboard_bundle(profile, recent_logs, weather_data)
+    health_tips = bundle['tips']
+    location_alerts = bundle['alerts']
     
     return render_template('dashboard.html', 
                          profile=profile, 
@@ -128,42 +206,35 @@ def dashboard():
                          moment=datetime)
 
 @app.route('/lifestyle_log', methods=['GET', 'POST'])
-def lifestyle_log():
-    if 'user_id' not in session:
-        return redirect(url_for('login'))
-    
-    user_id = session['user_id']
-    
+@login_required
+def lifestyle_log(user_id):
     if request.method == 'POST':
-        log_entry = {
-            'date': datetime.now().date().isoformat(),
-            'sleep_hours': float(request.form['sleep_hours']),
-            'exercise_minutes': int(request.form['exercise_minutes']),
-            'water_glasses': int(request.form['water_glasses']),
-            'meals': request.form['meals'],
-            'notes': request.form.get('notes', ''),
-            'logged_at': datetime.now()
-        }
+        now = datetime.now()
         
         if user_id not in lifestyle_logs:
-            lifestyle_logs[user_id] = []
+            lifestyle_logs[user_id] = LifestyleLogSeries(user_id)
         
-        lifestyle_logs[user_id].append(log_entry)
+        lifestyle_logs[user_id].append(
+            date=now.date().isoformat(),
+            sleep_hours=float(request.form['sleep_hours']),
+            exercise_minutes=int(request.form['exercise_minutes']),
+            water_glasses=int(request.form['water_glasses']),
+            meals=request.form['meals'],
+            notes=request.form.get('notes', ''),
+            logged_at=now
+        )
         flash('Lifestyle data logged successfully!', 'success')
         return redirect(url_for('lifestyle_log'))
     
     # Get user's logs for the past 30 days
-    user_logs = lifestyle_logs.get(user_id, [])
+    user_logs = get_log_series(user_id).rows(30)
     return render_template('lifestyle_log.html', logs=user_logs)
 
 @app.route('/health_tips')
-def health_tips():
-    if 'user_id' not in session:
-        return redirect(url_for('login'))
-    
-    user_id = session['user_id']
-    profile = user_profiles.get(user_id, {})
-    recent_logs = lifestyle_logs.get(user_id, [])[-14:]  # Last 14 days
+@login_required
+def health_tips(user_id):
+    profile = user_profiles[user_id]
+    recent_logs = get_log_series(user_id).rows(14)  # Last 14 days
     
     # Get comprehensive health tips
     tips = health_ai.get_comprehensive_health_tips(profile, recent_logs)
@@ -171,17 +242,14 @@ def health_tips():
     return render_template('health_tips.html', tips=tips)
 
 @app.route('/alerts')
-def alerts():
-    if 'user_id' not in session:
-        return redirect(url_for('login'))
-    
-    user_id = session['user_id']
-    profile = user_profiles.get(user_id, {})
+@login_required
+def alerts(user_id):
+    profile = user_profiles[user_id]
     
     alerts = []
-    if profile.get('location'):
+    if profile.location:
         try:
-            weather_data = weather_service.get_weather_alerts(profile['location'])
+            weather_data = weather_service.get_weather_alerts(profile.location)
             if weather_data:
                 alerts = health_ai.get_detailed_location_alerts(weather_data, profile)
             else:
@@ -193,17 +261,13 @@ def alerts():
     return render_template('alerts.html', alerts=alerts)
 
 @app.route('/chatbot')
-def chatbot():
-    if 'user_id' not in session:
-        return redirect(url_for('login'))
-    
+@login_required
+def chatbot(user_id):
     return render_template('chatbot.html')
 
 @app.route('/api/chat', methods=['POST'])
-def chat_api():
-    if 'user_id' not in session:
-        return jsonify({'error': 'Unauthorized'}), 401
-    
+@api_login_required
+def chat_api(user_id):
     data = request.get_json()
     message = data.get('message', '').strip()
     
@@ -211,8 +275,7 @@ def chat_api():
         return jsonify({'error': 'Message cannot be empty'}), 400
     
     try:
-        user_id = session['user_id']
-        profile = user_profiles.get(user_id, {})
+        profile = user_profiles[user_id]
         response = health_ai.chat_response(message, profile)
         return jsonify({'response': response})
     except Exception as e:
@@ -220,30 +283,28 @@ def chat_api():
         return jsonify({'error': 'Sorry, I encountered an error. Please try again.'}), 500
 
 @app.route('/api/lifestyle_chart_data')
-def lifestyle_chart_data():
-    if 'user_id' not in session:
-        return jsonify({'error': 'Unauthorized'}), 401
-    
-    user_id = session['user_id']
-    logs = lifestyle_logs.get(user_id, [])
+@api_login_required
+def lifestyle_chart_data(user_id):
+    series = get_log_series(user_id)
     
     # Get last 7 days of data
-    recent_logs = logs[-7:] if len(logs) >= 7 else logs
-    
+    sleep_data = series.sleep_hours[-7:]
     chart_data = {
-        'labels': [],
-        'sleep_data': [],
-        'exercise_data': [],
-        'water_data': []
+        'labels': series.dates[-7:],
+        'sleep_data': sleep_data.tolist(),
+        'sleep_trend': rolling_mean(sleep_data, 3),
+        'exercise_data': series.exercise_minutes[-7:].tolist(),
+        'water_data': series.water_glasses[-7:].tolist()
     }
     
-    for log in recent_logs:
-        chart_data['labels'].append(log['date'])
-        chart_data['sleep_data'].append(log['sleep_hours'])
-        chart_data['exercise_data'].append(log['exercise_minutes'])
-        chart_data['water_data'].append(log['water_glasses'])
-    
     return jsonify(chart_data)
 
+def preload_templates():
+    """Compile all templates up front so the first requests don't pay for it."""
+    for name in app.jinja_env.list_templates(extensions=['html']):
+        app.jinja_env.get_template(name)
+
+preload_templates()
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,14 @@
+"""
+Gunicorn settings for serving the app in production.
+"""
+
+# User data lives in in-process dictionaries, so run a single worker process
+# and get concurrency from threads. Requests spend most of their time waiting
+# on OpenAI and the weather API, which releases the GIL.
+workers = 1
+worker_class = "gthread"
+threads = 16
+
+# AI requests can legitimately take several seconds
+timeout = 120
+keepalive = 5
@@ -1,19 +1,161 @@
 import os
 import json
+import hashlib
 import logging
-from typing import Dict, List, Any
+from dataclasses import asdict
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, List, Any, Mapping, Optional, Sequence, Tuple
 from openai import OpenAI
+from cache import TTLCache
+from models import LifestyleLogWindow, UserProfile
+from analytics import streak_above
+
+# Static fallback content, built once at import time. These are immutable, so
+# they can be handed straight to templates without copying on every call.
+_FALLBACK_TIPS = (
+    "Stay hydrated by drinking at least 8 glasses of water daily",
+    "Aim for 7-9 hours of quality sleep each night",
+    "Include at least 30 minutes of physical activity in your daily routine",
+    "Eat a balanced diet rich in fruits, vegetables, and whole grains",
+    "Practice stress management techniques like deep breathing or meditation"
+)
+
+_FALLBACK_COMPREHENSIVE_TIPS = MappingProxyType({
+    "nutrition": (
+        "Eat 5 servings of fruits and vegetables daily",
+        "Choose whole grains over refined grains",
+        "Limit processed foods and added sugars"
+    ),
+    "exercise": (
+        "Aim for 150 minutes of moderate exercise weekly",
+        "Include strength training 2-3 times per week",
+        "Take regular breaks from sitting"
+    ),
+    "sleep": (
+        "Maintain a consistent sleep schedule",
+        "Create a relaxing bedtime routine",
+        "Keep your bedroom cool and dark"
+    ),
+    "mental_health": (
+        "Practice mindfulness or meditation",
+        "Stay connected with friends and family",
+        "Seek help when feeling overwhelmed"
+    ),
+    "preventive_care": (
+        "Schedule regular check-ups with your doctor",
+        "Stay up-to-date with vaccinations",
+        "Monitor your vital signs regularly"
+    )
+})
+
+_FALLBACK_DETAILED_ALERTS = (
+    MappingProxyType({
+        'type': 'info',
+        'category': 'General Health',
+        'title': 'Daily Health Reminder',
+        'message': 'Remember to stay hydrated and maintain your daily health routines',
+        'recommendations': ('Drink plenty of water', 'Get adequate sleep', 'Stay active')
+    }),
+)
+
+_FALLBACK_CHAT_RESPONSE = (
+    "I understand you're asking about health topics. While I'd love to help, "
+    "I recommend consulting with a qualified healthcare professional for personalized advice. "
+    "In the meantime, focus on the basics: stay hydrated, get enough sleep, eat well, "
+    "and stay active. Is there anything specific about your lifestyle habits I can help you track?"
+)
+
+# Weather alert thresholds: (field, fires when above threshold, threshold,
+# borderline margin, alert). Readings within the margin of a threshold are
+# ambiguous enough to be worth asking the AI about.
+_ALERT_RULES = (
+    ('temperature', True, 30, 2, MappingProxyType({
+        'type': 'warning',
+        'title': 'High Temperature Alert',
+        'message': 'Stay hydrated and avoid prolonged sun exposure'
+    })),
+    ('temperature', False, 0, 2, MappingProxyType({
+        'type': 'warning',
+        'title': 'Freezing Temperature Alert',
+        'message': 'Dress in warm layers and limit time outdoors to prevent frostbite'
+    })),
+    ('humidity', True, 80, 5, MappingProxyType({
+        'type': 'info',
+        'title': 'High Humidity',
+        'message': 'Take breaks in air-conditioned spaces when possible'
+    })),
+    ('uv_index', True, 7, 1, MappingProxyType({
+        'type': 'warning',
+        'title': 'High UV Index',
+        'message': 'Use sunscreen and avoid direct sun around midday'
+    })),
+    ('wind_speed', True, 15, 3, MappingProxyType({
+        'type': 'info',
+        'title': 'Strong Winds',
+        'message': 'Take care outdoors and protect your eyes and airways from dust'
+    }))
+)
+
+def _evaluate_alert_rules(weather_data: Mapping) -> Tuple[List[Mapping], bool]:
+    """Apply the alert threshold table, also reporting whether any reading was borderline."""
+    alerts = []
+    uncertain = False
+    for field, above, threshold, margin, alert in _ALERT_RULES:
+        value = weather_data.get(field)
+        if value is None:
+            continue
+        if abs(value - threshold) <= margin:
+            uncertain = True
+        if (value > threshold) if above else (value < threshold):
+            alerts.append(alert)
+    return alerts, uncertain
+
+# Prompt fragments that depend only on profile fields are built once per
+# distinct profile and reused until the profile changes.
+@lru_cache(maxsize=1024)
+def _profile_context(age, gender, location, exercise_frequency, sleep_hours, diet_type) -> str:
+    """Build the profile part of the user context string."""
+    return (f"Age: {age}, Gender: {gender}, "
+            f"Location: {location}, "
+            f"Exercise Frequency: {exercise_frequency}, "
+            f"Typical Sleep: {sleep_hours} hours, "
+            f"Diet Type: {diet_type}")
+
+@lru_cache(maxsize=1024)
+def _chat_system_prompt(age, gender) -> str:
+    """Build the chatbot system prompt for a user's age and gender."""
+    return f"""
+            You are a helpful healthcare AI assistant. Answer health-related questions with accurate, 
+            helpful information while emphasizing that you're not replacing professional medical advice.
+            
+            User Profile: Age {age}, Gender {gender}
+            
+            Guidelines:
+            - Provide helpful, evidence-based health information
+            - Always recommend consulting healthcare professionals for serious concerns
+            - Be supportive and encouraging
+            - Keep responses concise but informative
+            """
 
 class HealthAI:
     def __init__(self):
         self.api_key = os.environ.get("OPENAI_API_KEY")
         self.client = OpenAI(api_key=self.api_key) if self.api_key else None
         
-    def get_personalized_tips(self, profile: Dict, recent_logs: List[Dict]) -> List[str]:
+        # Successful AI responses keyed by a hash of the request context
+        self._response_cache = TTLCache(maxsize=4096, ttl=3600)
+        
+    def get_personalized_tips(self, profile: UserProfile, recent_logs: LifestyleLogWindow) -> Sequence[str]:
         """Generate personalized health tips based on user profile and recent logs."""
         if not self.client:
             return self._get_fallback_tips(profile)
         
+        cache_key = self._cache_key("tips", profile, recent_logs)
+        cached = self._response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
             # Analyze user data
             user_context = self._build_user_context(profile, recent_logs)
@@ -28,18 +170,13 @@ class HealthAI:
             {{"tips": ["tip1", "tip2", "tip3", "tip4", "tip5"]}}
             """
             
-            # the newest OpenAI model is "gpt-5" which was released August 7, 2025.
-            # do not change this unless explicitly requested by the user
-            response = self.client.chat.completions.create(
-                model="gpt-5",
-                messages=[{"role": "user", "content": prompt}],
-                response_format={"type": "json_object"}
-            )
-            
-            content = response.choices[0].message.content
-            if content:
-                result = json.loads(content)
-                return result.get("tips", self._get_fallback_tips(profile))
+            result = self._complete_json(prompt)
+            if result:
+                tips = result.get("tips")
+                if tips is None:
+                    return self._get_fallback_tips(profile)
+                self._response_cache.set(cache_key, tips)
+                return tips
             else:
                 return self._get_fallback_tips(profile)
             
@@ -47,45 +184,70 @@ class HealthAI:
             logging.error(f"Error generating personalized tips: {e}")
             return self._get_fallback_tips(profile)
     
-    def get_location_based_alerts(self, weather_data: Dict, profile: Dict) -> List[Dict]:
-        """Generate location-based health alerts."""
-        if not self.client or not weather_data:
-            return self._get_fallback_alerts(weather_data)
+    def get_dashboard_bundle(self, profile: UserProfile, recent_logs: LifestyleLogWindow,
+                             weather_data: Optional[Dict] = None) -> Dict[str, Sequence]:
+        """Generate dashboard tips and location alerts with a single AI request."""
+        rule_alerts, uncertain = _evaluate_alert_rules(weather_data) if weather_data else ([], False)
+        if not uncertain:
+            # Weather is unambiguous (or unavailable), so only the tips need the AI
+            return {
+                'tips': self.get_personalized_tips(profile, recent_logs),
+                'alerts': rule_alerts
+            }
+        
+        if not self.client:
+            return self._get_fallback_bundle(profile, weather_data)
+        
+        weather_json = json.dumps(weather_data)
+        cache_key = self._cache_key("dashboard", profile, recent_logs, weather_json)
+        cached = self._response_cache.get(cache_key)
+        if cached is not None:
+            return cached
         
         try:
+            user_context = self._build_user_context(profile, recent_logs)
+            
             prompt = f"""
-            You are a healthcare AI assistant. Based on the current weather conditions and user profile,
-            identify potential health risks and provide preventive advice.
+            You are a healthcare AI assistant. Based on the following user profile and recent lifestyle data, 
+            provide 5 personalized preventive health tips. Focus on actionable advice that can improve their health.
             
-            Weather Data: {json.dumps(weather_data)}
-            User Profile: Age {profile.get('age', 'unknown')}, Gender {profile.get('gender', 'unknown')}, Location {profile.get('location', 'unknown')}
+            User Context: {user_context}
+            Weather Data: {weather_json}
+            
+            Also identify potential health risks from the current weather conditions and provide preventive advice.
             
             Provide your response as a JSON object with this format:
-            {{"alerts": [{{"type": "warning/info", "title": "Alert Title", "message": "Alert message"}}]}}
+            {{"tips": ["tip1", "tip2", "tip3", "tip4", "tip5"], "alerts": [{{"type": "warning/info", "title": "Alert Title", "message": "Alert message"}}]}}
             """
             
-            response = self.client.chat.completions.create(
-                model="gpt-5",
-                messages=[{"role": "user", "content": prompt}],
-                response_format={"type": "json_object"}
-            )
+            result = self._complete_json(prompt)
+            if not result:
+                return self._get_fallback_bundle(profile, weather_data)
             
-            content = response.choices[0].message.content
-            if content:
-                result = json.loads(content)
-                return result.get("alerts", self._get_fallback_alerts(weather_data))
-            else:
-                return self._get_fallback_alerts(weather_data)
+            tips = result.get("tips")
+            alerts = result.get("alerts")
+            bundle = {
+                'tips': tips if tips is not None else self._get_fallback_tips(profile),
+                'alerts': alerts if alerts is not None else self._get_fallback_alerts(weather_data)
+            }
+            if tips is not None and alerts is not None:
+                self._response_cache.set(cache_key, bundle)
+            return bundle
             
         except Exception as e:
-            logging.error(f"Error generating location alerts: {e}")
-            return self._get_fallback_alerts(weather_data)
+            logging.error(f"Error generating dashboard bundle: {e}")
+            return self._get_fallback_bundle(profile, weather_data)
     
-    def get_comprehensive_health_tips(self, profile: Dict, recent_logs: List[Dict]) -> Dict:
+    def get_comprehensive_health_tips(self, profile: UserProfile, recent_logs: LifestyleLogWindow) -> Mapping[str, Sequence[str]]:
         """Get comprehensive health tips organized by category."""
         if not self.client:
             return self._get_fallback_comprehensive_tips()
         
+        cache_key = self._cache_key("comprehensive_tips", profile, recent_logs)
+        cached = self._response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
             user_context = self._build_user_context(profile, recent_logs)
             
@@ -105,15 +267,9 @@ class HealthAI:
             }}
             """
             
-            response = self.client.chat.completions.create(
-                model="gpt-5",
-                messages=[{"role": "user", "content": prompt}],
-                response_format={"type": "json_object"}
-            )
-            
-            content = response.choices[0].message.content
-            if content:
-                result = json.loads(content)
+            result = self._complete_json(prompt)
+            if result:
+                self._response_cache.set(cache_key, result)
                 return result
             else:
                 return self._get_fallback_comprehensive_tips()
@@ -122,17 +278,27 @@ class HealthAI:
             logging.error(f"Error generating comprehensive tips: {e}")
             return self._get_fallback_comprehensive_tips()
     
-    def get_detailed_location_alerts(self, weather_data: Dict, profile: Dict) -> List[Dict]:
+    def get_detailed_location_alerts(self, weather_data: Dict, profile: UserProfile) -> Sequence[Mapping]:
         """Get detailed location-based health alerts."""
         if not self.client:
             return self._get_fallback_detailed_alerts()
         
+        weather_json = json.dumps(weather_data)
+        # Internal ids are not part of the prompt sent to the external API
+        profile_fields = asdict(profile)
+        del profile_fields['user_id']
+        profile_json = json.dumps(profile_fields)
+        cache_key = self._cache_key("detailed_alerts", weather_json, profile_json)
+        cached = self._response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
             prompt = f"""
             You are a healthcare AI assistant. Analyze current weather conditions and provide detailed health alerts.
             
-            Weather Data: {json.dumps(weather_data)}
-            User Profile: {json.dumps(profile)}
+            Weather Data: {weather_json}
+            User Profile: {profile_json}
             
             Focus on:
             - Temperature-related health risks
@@ -154,16 +320,13 @@ class HealthAI:
             }}
             """
             
-            response = self.client.chat.completions.create(
-                model="gpt-5",
-                messages=[{"role": "user", "content": prompt}],
-                response_format={"type": "json_object"}
-            )
-            
-            content = response.choices[0].message.content
-            if content:
-                result = json.loads(content)
-                return result.get("alerts", self._get_fallback_detailed_alerts())
+            result = self._complete_json(prompt)
+            if result:
+                alerts = result.get("alerts")
+                if alerts is None:
+                    return self._get_fallback_detailed_alerts()
+                self._response_cache.set(cache_key, alerts)
+                return alerts
             else:
                 return self._get_fallback_detailed_alerts()
             
@@ -171,24 +334,13 @@ class HealthAI:
             logging.error(f"Error generating detailed alerts: {e}")
             return self._get_fallback_detailed_alerts()
     
-    def chat_response(self, message: str, profile: Dict) -> str:
+    def chat_response(self, message: str, profile: UserProfile) -> str:
         """Generate a response to user's health-related question."""
         if not self.client:
             return self._get_fallback_chat_response(message)
         
         try:
-            system_prompt = f"""
-            You are a helpful healthcare AI assistant. Answer health-related questions with accurate, 
-            helpful information while emphasizing that you're not replacing professional medical advice.
-            
-            User Profile: Age {profile.get('age', 'unknown')}, Gender {profile.get('gender', 'unknown')}
-            
-            Guidelines:
-            - Provide helpful, evidence-based health information
-            - Always recommend consulting healthcare professionals for serious concerns
-            - Be supportive and encouraging
-            - Keep responses concise but informative
-            """
+            system_prompt = _chat_system_prompt(profile.age, profile.gender)
             
             response = self.client.chat.completions.create(
                 model="gpt-5",
@@ -205,107 +357,85 @@ class HealthAI:
             logging.error(f"Error generating chat response: {e}")
             return self._get_fallback_chat_response(message)
     
-    def _build_user_context(self, profile: Dict, recent_logs: List[Dict]) -> str:
+    def _complete_json(self, prompt: str) -> Optional[Dict]:
+        """Send a JSON-mode prompt and return the parsed object, or None if empty."""
+        # the newest OpenAI model is "gpt-5" which was released August 7, 2025.
+        # do not change this unless explicitly requested by the user
+        response = self.client.chat.completions.create(
+            model="gpt-5",
+            messages=[{"role": "user", "content": prompt}],
+            response_format={"type": "json_object"}
+        )
+        
+        content = response.choices[0].message.content
+        return json.loads(content) if content else None
+    
+    def _cache_key(self, kind: str, *parts: Any) -> str:
+        """Build a compact cache key from the request kind and its context.
+        
+        Parts that also go into the prompt should be passed already serialized,
+        so each payload is encoded once per request.
+        """
+        payload = json.dumps(parts, sort_keys=True, default=str).encode()
+        return f"{kind}:{hashlib.blake2b(payload, digest_size=16).hexdigest()}"
+    
+    def _build_user_context(self, profile: UserProfile, recent_logs: LifestyleLogWindow) -> str:
         """Build user context string for AI prompts."""
-        context = f"Age: {profile.get('age', 'unknown')}, Gender: {profile.get('gender', 'unknown')}, "
-        context += f"Location: {profile.get('location', 'unknown')}, "
-        context += f"Exercise Frequency: {profile.get('exercise_frequency', 'unknown')}, "
-        context += f"Typical Sleep: {profile.get('sleep_hours', 'unknown')} hours, "
-        context += f"Diet Type: {profile.get('diet_type', 'unknown')}"
+        context = _profile_context(profile.age, profile.gender, profile.location,
+                                   profile.exercise_frequency, profile.sleep_hours, profile.diet_type)
         
         if recent_logs:
-            avg_sleep = sum(log.get('sleep_hours', 0) for log in recent_logs) / len(recent_logs)
-            avg_exercise = sum(log.get('exercise_minutes', 0) for log in recent_logs) / len(recent_logs)
-            avg_water = sum(log.get('water_glasses', 0) for log in recent_logs) / len(recent_logs)
+            # Reduce the typed array columns rather than looking up each entry dict
+            count = len(recent_logs)
+            avg_sleep = sum(recent_logs.sleep_hours) / count
+            avg_exercise = sum(recent_logs.exercise_minutes) / count
+            avg_water = sum(recent_logs.water_glasses) / count
             
             context += f"\nRecent averages: Sleep: {avg_sleep:.1f}h, Exercise: {avg_exercise:.0f}min, Water: {avg_water:.0f} glasses"
+            
+            sleep_streak = streak_above(recent_logs.sleep_hours, 7)
+            exercise_streak = streak_above(recent_logs.exercise_minutes, 30)
+            # Streaks count log entries (a day may have several) within this window only
+            context += (f"\nStreaks within the last {count} log entries: {sleep_streak} consecutive entries "
+                        f"with 7+h sleep, {exercise_streak} consecutive entries with 30+min exercise")
         
         return context
     
-    def _get_fallback_tips(self, profile: Dict) -> List[str]:
+    def _get_fallback_tips(self, profile: UserProfile) -> Sequence[str]:
         """Provide fallback tips when AI is unavailable."""
-        tips = [
-            "Stay hydrated by drinking at least 8 glasses of water daily",
-            "Aim for 7-9 hours of quality sleep each night",
-            "Include at least 30 minutes of physical activity in your daily routine",
-            "Eat a balanced diet rich in fruits, vegetables, and whole grains",
-            "Practice stress management techniques like deep breathing or meditation"
-        ]
+        extra_tips = []
         
         # Customize based on profile
-        if profile.get('age', 0) > 50:
-            tips.append("Schedule regular health check-ups and screenings")
+        if profile.age > 50:
+            extra_tips.append("Schedule regular health check-ups and screenings")
         
-        if profile.get('sleep_hours', 8) < 7:
-            tips.append("Focus on improving your sleep quality and duration")
+        if profile.sleep_hours < 7:
+            extra_tips.append("Focus on improving your sleep quality and duration")
         
-        return tips
+        if not extra_tips:
+            return _FALLBACK_TIPS
+        return list(_FALLBACK_TIPS) + extra_tips
     
-    def _get_fallback_alerts(self, weather_data: Dict) -> List[Dict]:
+    def _get_fallback_alerts(self, weather_data: Dict) -> List[Mapping]:
         """Provide fallback alerts when AI is unavailable."""
-        alerts = []
-        
-        if weather_data.get('temperature', 20) > 30:
-            alerts.append({
-                'type': 'warning',
-                'title': 'High Temperature Alert',
-                'message': 'Stay hydrated and avoid prolonged sun exposure'
-            })
-        
-        if weather_data.get('humidity', 50) > 80:
-            alerts.append({
-                'type': 'info',
-                'title': 'High Humidity',
-                'message': 'Take breaks in air-conditioned spaces when possible'
-            })
-        
+        alerts, _ = _evaluate_alert_rules(weather_data)
         return alerts
     
-    def _get_fallback_comprehensive_tips(self) -> Dict:
-        """Provide fallback comprehensive tips."""
+    def _get_fallback_bundle(self, profile: UserProfile, weather_data: Optional[Dict]) -> Dict[str, Sequence]:
+        """Provide fallback dashboard tips and alerts."""
         return {
-            "nutrition": [
-                "Eat 5 servings of fruits and vegetables daily",
-                "Choose whole grains over refined grains",
-                "Limit processed foods and added sugars"
-            ],
-            "exercise": [
-                "Aim for 150 minutes of moderate exercise weekly",
-                "Include strength training 2-3 times per week",
-                "Take regular breaks from sitting"
-            ],
-            "sleep": [
-                "Maintain a consistent sleep schedule",
-                "Create a relaxing bedtime routine",
-                "Keep your bedroom cool and dark"
-            ],
-            "mental_health": [
-                "Practice mindfulness or meditation",
-                "Stay connected with friends and family",
-                "Seek help when feeling overwhelmed"
-            ],
-            "preventive_care": [
-                "Schedule regular check-ups with your doctor",
-                "Stay up-to-date with vaccinations",
-                "Monitor your vital signs regularly"
-            ]
+            'tips': self._get_fallback_tips(profile),
+            'alerts': self._get_fallback_alerts(weather_data) if weather_data else []
         }
     
-    def _get_fallback_detailed_alerts(self) -> List[Dict]:
+    def _get_fallback_comprehensive_tips(self) -> Mapping[str, Sequence[str]]:
+        """Provide fallback comprehensive tips."""
+        return _FALLBACK_COMPREHENSIVE_TIPS
+    
+    def _get_fallback_detailed_alerts(self) -> Sequence[Mapping]:
         """Provide fallback detailed alerts."""
-        return [
-            {
-                'type': 'info',
-                'category': 'General Health',
-                'title': 'Daily Health Reminder',
-                'message': 'Remember to stay hydrated and maintain your daily health routines',
-                'recommendations': ['Drink plenty of water', 'Get adequate sleep', 'Stay active']
-            }
-        ]
+        return _FALLBACK_DETAILED_ALERTS
     
     def _get_fallback_chat_response(self, message: str) -> str:
         """Provide fallback chat response."""
-        return ("I understand you're asking about health topics. While I'd love to help, "
-                "I recommend consulting with a qualified healthcare professional for personalized advice. "
-                "In the meantime, focus on the basics: stay hydrated, get enough sleep, eat well, "
-                "and stay active. Is there anything specific about your lifestyle habits I can help you track?")
+        return _FALLBACK_CHAT_RESPONSE
@@ -3,36 +3,117 @@ Data models for the healthcare application.
 This file defines the structure of our in-memory data storage.
 """
 
+from array import array
+from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Dict, List, Optional
 
+@dataclass(slots=True, frozen=True)
 class User:
-    def __init__(self, id: int, name: str, email: str, password_hash: str):
-        self.id = id
-        self.name = name
-        self.email = email
-        self.password_hash = password_hash
-        self.created_at = datetime.now()
+    id: int
+    name: str
+    email: str
+    password_hash: str
+    created_at: datetime = field(default_factory=datetime.now)
 
+@dataclass(slots=True, frozen=True)
 class UserProfile:
-    def __init__(self, user_id: int, age: int, gender: str, location: str, 
-                 exercise_frequency: str, sleep_hours: int, diet_type: str):
-        self.user_id = user_id
-        self.age = age
-        self.gender = gender
-        self.location = location
-        self.exercise_frequency = exercise_frequency
-        self.sleep_hours = sleep_hours
-        self.diet_type = diet_type
+    user_id: int
+    age: int
+    gender: str
+    location: str
+    exercise_frequency: str
+    sleep_hours: int
+    diet_type: str
 
+@dataclass(slots=True, frozen=True)
 class LifestyleLog:
-    def __init__(self, user_id: int, date: str, sleep_hours: float, 
-                 exercise_minutes: int, water_glasses: int, meals: str, notes: str = ""):
+    user_id: int
+    date: str
+    sleep_hours: float
+    exercise_minutes: int
+    water_glasses: int
+    meals: str
+    notes: str = ""
+    logged_at: datetime = field(default_factory=datetime.now)
+
+class LifestyleLogSeries:
+    """Column-oriented storage of one user's lifestyle logs.
+    
+    Numeric metrics live in typed arrays rather than one dict per entry, so
+    chart data is a slice of each column instead of a loop over entries.
+    """
+    def __init__(self, user_id: int):
         self.user_id = user_id
-        self.date = date
-        self.sleep_hours = sleep_hours
-        self.exercise_minutes = exercise_minutes
-        self.water_glasses = water_glasses
-        self.meals = meals
-        self.notes = notes
-        self.logged_at = datetime.now()
+        self.dates: List[str] = []
+        self.sleep_hours = array('d')
+        self.exercise_minutes = array('i')
+        self.water_glasses = array('i')
+        self.meals: List[str] = []
+        self.notes: List[str] = []
+        self.logged_at: List[datetime] = []
+        
+        # Recent-entry windows by limit, each stamped with the length it was built at
+        self._windows: Dict[Optional[int], tuple] = {}
+    
+    def __len__(self) -> int:
+        return len(self.dates)
+    
+    def append(self, date: str, sleep_hours: float, exercise_minutes: int,
+               water_glasses: int, meals: str, notes: str = "",
+               logged_at: Optional[datetime] = None):
+        self.sleep_hours.append(sleep_hours)
+        self.exercise_minutes.append(exercise_minutes)
+        self.water_glasses.append(water_glasses)
+        self.meals.append(meals)
+        self.notes.append(notes)
+        self.logged_at.append(logged_at or datetime.now())
+        # __len__ follows dates, so append it last: a concurrent reader never
+        # sees an entry before every column holds it
+        self.dates.append(date)
+    
+    def rows(self, limit: Optional[int] = None) -> 'LifestyleLogWindow':
+        """Return the most recent entries (all if limit is None) as a window of LifestyleLogs.
+        
+        Windows are reused until the next append, so callers must not modify them.
+        """
+        end = len(self)
+        cached = self._windows.get(limit)
+        if cached is not None and cached[0] == end:
+            return cached[1]
+        
+        start = 0 if limit is None else max(end - limit, 0)
+        window = LifestyleLogWindow(
+            (
+                LifestyleLog(
+                    user_id=self.user_id,
+                    date=self.dates[i],
+                    sleep_hours=self.sleep_hours[i],
+                    exercise_minutes=self.exercise_minutes[i],
+                    water_glasses=self.water_glasses[i],
+                    meals=self.meals[i],
+                    notes=self.notes[i],
+                    logged_at=self.logged_at[i]
+                )
+                for i in range(start, end)
+            ),
+            sleep_hours=self.sleep_hours[start:end],
+            exercise_minutes=self.exercise_minutes[start:end],
+            water_glasses=self.water_glasses[start:end]
+        )
+        self._windows[limit] = (end, window)
+        return window
+
+class LifestyleLogWindow(list):
+    """A list of recent log entries that also carries their numeric columns.
+    
+    Templates iterate the entries as LifestyleLogs, while aggregate calculations can
+    reduce the typed array columns directly without per-entry dict lookups.
+    """
+    __slots__ = ('sleep_hours', 'exercise_minutes', 'water_glasses')
+    
+    def __init__(self, entries=(), sleep_hours=None, exercise_minutes=None, water_glasses=None):
+        super().__init__(entries)
+        self.sleep_hours = sleep_hours if sleep_hours is not None else array('d')
+        self.exercise_minutes = exercise_minutes if exercise_minutes is not None else array('i')
+        self.water_glasses = water_glasses if water_glasses is not None else array('i')
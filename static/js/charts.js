@@ -68,6 +68,17 @@ function createLifestyleChart(data) {
                 pointRadius: 5,
                 pointHoverRadius: 7
             },
+            {
+                label: 'Sleep Trend (3-entry avg)',
+                data: data.sleep_trend && data.sleep_trend.length > 0 ? data.sleep_trend : [0],
+                borderColor: 'rgba(13, 110, 253, 0.6)',
+                borderWidth: 2,
+                borderDash: [6, 4],
+                fill: false,
+                tension: 0.4,
+                pointRadius: 0,
+                pointHoverRadius: 4
+            },
             {
                 label: 'Exercise Minutes',
                 data: data.exercise_data.length > 0 ? data.exercise_data : [0],
@@ -141,6 +152,8 @@ function createLifestyleChart(data) {
                             
                             if (label === 'Sleep Hours') {
                                 return `${label}: ${value}h`;
+                            } else if (label === 'Sleep Trend (3-entry avg)') {
+                                return `${label}: ${value.toFixed(1)}h`;
                             } else if (label === 'Exercise Minutes') {
                                 return `${label}: ${value} min`;
                             } else if (label === 'Water Glasses') {
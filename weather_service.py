@@ -1,18 +1,51 @@
 import os
 import requests
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from cache import TTLCache
 
 class WeatherService:
     def __init__(self):
         self.api_key = os.environ.get("WEATHER_API_KEY")
         self.base_url = "http://api.openweathermap.org/data/2.5"
         
+        # Long-lived session so keep-alive connections are reused across requests
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=50,
+            pool_maxsize=50,
+            max_retries=Retry(total=3, backoff_factor=0.2)
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        
+        # Weather changes on the scale of minutes, UV index more slowly
+        self._weather_cache = TTLCache(maxsize=1024, ttl=300)
+        self._uv_cache = TTLCache(maxsize=1024, ttl=1800)
+        
+        # Coordinates of previously resolved locations, so the UV request can
+        # be issued alongside the current-weather request instead of after it
+        self._coords_cache = TTLCache(maxsize=1024, ttl=86400)
+        self.executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="weather")
+        
     def get_weather_alerts(self, location: str) -> Optional[Dict]:
         """Get current weather data for location-based health alerts."""
         if not self.api_key:
             return self._get_fallback_weather_data(location)
         
+        cache_key = location.lower().strip()
+        cached = self._weather_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        uv_future = None
+        coords = self._coords_cache.get(cache_key)
+        if coords is not None:
+            uv_future = self.executor.submit(self._get_uv_index, *coords)
+        
         try:
             # Get current weather
             current_url = f"{self.base_url}/weather"
@@ -22,11 +55,15 @@ class WeatherService:
                 'units': 'metric'
             }
             
-            response = requests.get(current_url, params=params, timeout=10)
+            response = self.session.get(current_url, params=params, timeout=10)
             response.raise_for_status()
             
             data = response.json()
             
+            lat, lon = data['coord']['lat'], data['coord']['lon']
+            self._coords_cache.set(cache_key, (lat, lon))
+            uv_index = uv_future.result() if uv_future is not None else self._get_uv_index(lat, lon)
+            
             weather_data = {
                 'location': data['name'],
                 'country': data['sys']['country'],
@@ -38,9 +75,11 @@ class WeatherService:
                 'weather_description': data['weather'][0]['description'],
                 'wind_speed': data['wind']['speed'],
                 'visibility': data.get('visibility', 10000) / 1000,  # Convert to km
-                'uv_index': self._get_uv_index(data['coord']['lat'], data['coord']['lon'])
+                'uv_index': uv_index
             }
             
+            # Only successful lookups are cached; fallback data is never stored
+            self._weather_cache.set(cache_key, weather_data)
             return weather_data
             
         except requests.exceptions.RequestException as e:
@@ -55,6 +94,11 @@ class WeatherService:
         if not self.api_key:
             return None
         
+        cache_key = (round(lat, 2), round(lon, 2))
+        cached = self._uv_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
             uv_url = f"{self.base_url}/uvi"
             params = {
@@ -63,11 +107,14 @@ class WeatherService:
                 'appid': self.api_key
             }
             
-            response = requests.get(uv_url, params=params, timeout=5)
+            response = self.session.get(uv_url, params=params, timeout=5)
             response.raise_for_status()
             
             data = response.json()
-            return data.get('value')
+            uv_index = data.get('value')
+            if uv_index is not None:
+                self._uv_cache.set(cache_key, uv_index)
+            return uv_index
             
         except Exception as e:
             logging.error(f"UV index request failed: {e}")